@@ -6,7 +6,13 @@ SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///./blog.db"
 
 engine = create_async_engine(
     SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False}
+    connect_args={"check_same_thread": False},
+    pool_size=20,            # Persistent connections kept open for concurrent requests
+    max_overflow=10,         # Extra connections allowed under burst load
+    pool_timeout=30,         # Fail fast instead of queueing forever on checkout
+    pool_pre_ping=True,      # Drop stale connections instead of erroring mid-request
+    pool_recycle=1800,       # Recycle connections after 30 minutes
+    query_cache_size=1200,   # Reuse compiled SQL across requests
 )
 
 AsyncSessionLocal = async_sessionmaker(
@@ -1,19 +1,24 @@
-from typing import Annotated
+import time
+from typing import Annotated, NamedTuple
 from contextlib import asynccontextmanager
+from datetime import datetime
 
-from fastapi import FastAPI, Request, status, Depends
+from fastapi import FastAPI, Query, Request, Response, status, Depends
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import HTMLResponse, ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.exceptions import HTTPException
 from fastapi.exceptions import RequestValidationError
-from fastapi.exception_handlers import http_exception_handler, request_validation_exception_handler
+from starlette.concurrency import run_in_threadpool
 from starlette.exceptions import HTTPException as StarletteHTTPException
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
 
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
+from sqlalchemy import func, select
+from sqlalchemy.orm import joinedload, raiseload, selectinload
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from database import Base, engine, get_db
+from database import AsyncSessionLocal, Base, engine, get_db
 from routers import posts, users
 import models
 
@@ -28,67 +33,142 @@ async def lifespan(_app: FastAPI):
     # Shutdown
     await engine.dispose()
 
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 app.mount("/static", StaticFiles(directory="static"), name="static")
 app.mount("/media", StaticFiles(directory="media"), name="media")
 
-templates = Jinja2Templates(directory="templates")
+# Templates never change at runtime: skip the mtime check on every render,
+# keep plenty of room in the environment cache, and persist compiled bytecode
+# so new workers start with warm templates. The environment is built
+# explicitly (autoescape on, matching Starlette's default) and handed to
+# Jinja2Templates, which no longer accepts environment options directly.
+templates = Jinja2Templates(
+    env=Environment(
+        loader=FileSystemLoader("templates"),
+        autoescape=True,
+        auto_reload=False,
+        cache_size=400,
+        bytecode_cache=FileSystemBytecodeCache(),
+    )
+)
+
+# The page templates are a fixed set, so resolve each compiled template once
+# at startup instead of going through the environment lookup per request.
+_home_template = templates.get_template("home.html")
+_post_template = templates.get_template("post.html")
+_user_posts_template = templates.get_template("user_posts.html")
+_error_template = templates.get_template("error.html")
+
+# Warm the rest so no first request pays template-compile cost.
+for _name in ("layout.html", "login.html", "register.html"):
+    templates.env.get_template(_name)
 
 app.include_router(posts.router, prefix="/api/post", tags =["posts"])
 app.include_router(users.router, prefix="/api/user", tags =["users"])
 
+class _Author(NamedTuple):
+    """What the feed template needs to render a post's author line."""
+    id: int
+    username: str
+    image_file: str | None
+
+    @property
+    def image_path(self) -> str:
+        if self.image_file:
+            return f"/media/profile_pics/{self.image_file}"
+        return "/static/profile_pics/default.jpg"
+
+
+# The feed shows the same handful of authors on every request, so remember
+# them for a minute instead of re-querying users on each page load. Only the
+# event loop touches this, so no locking is needed.
+_AUTHOR_CACHE_TTL = 60.0
+_AUTHOR_CACHE_MAX_SIZE = 10_000
+_author_cache: dict[int, tuple[float, _Author]] = {}
+
+
+async def _get_authors(db: AsyncSession, user_ids: set[int]) -> dict[int, _Author]:
+    now = time.monotonic()
+    authors: dict[int, _Author] = {}
+    missing = []
+    for user_id in user_ids:
+        cached = _author_cache.get(user_id)
+        if cached is not None and now - cached[0] < _AUTHOR_CACHE_TTL:
+            authors[user_id] = cached[1]
+        else:
+            missing.append(user_id)
+
+    if missing:
+        result = await db.execute(
+            select(models.User.id, models.User.username, models.User.image_file)
+            .where(models.User.id.in_(missing))
+        )
+        if len(_author_cache) >= _AUTHOR_CACHE_MAX_SIZE:
+            _author_cache.clear()
+        for row in result:
+            author = _Author(row.id, row.username, row.image_file)
+            _author_cache[row.id] = (now, author)
+            authors[row.id] = author
+
+    return authors
+
+
 @app.get("/", include_in_schema=False, name="home")
 @app.get("/posts", include_in_schema=False, name="posts")
-async def home(request: Request, db: Annotated[AsyncSession, Depends(get_db)]):
-    result = await db.execute(
+async def home(
+    request: Request,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    limit: Annotated[int, Query(ge=1, le=100)] = 50,
+    cursor: int | None = None,
+):
+    stmt = (
         select(models.Post)
-        .options(selectinload(models.Post.author))
-        .order_by(models.Post.date_posted.desc())
+        .options(raiseload("*"))
+        .order_by(models.Post.id.desc())
+        .limit(limit)
     )
+    if cursor is not None:
+        stmt = stmt.where(models.Post.id < cursor)
+    result = await db.execute(stmt)
     posts = result.scalars().all()
-    return templates.TemplateResponse(
-        request,
-        "home.html",
-        {
-            "posts": posts, "title": "Home"
-        }
+    authors = await _get_authors(db, {post.user_id for post in posts})
+    # Rendering a full page of posts is CPU-bound; do it on the threadpool so
+    # the event loop stays free for other requests.
+    html = await run_in_threadpool(
+        _home_template.render,
+        request=request,
+        posts=posts,
+        authors=authors,
+        title="Home",
     )
+    return HTMLResponse(html)
 
 
 @app.get("/post/{post_id}", include_in_schema=False, name="post_page")
 async def post_page(request: Request, post_id: int, db: Annotated[AsyncSession, Depends(get_db)]):
-    result = await db.execute(
-        select(models.Post)
-        .options(selectinload(models.Post.author))
-        .where(models.Post.id == post_id)
+    post = await db.get(
+        models.Post,
+        post_id,
+        options=[joinedload(models.Post.author), raiseload("*")],
     )
-    post = result.scalar_one_or_none()
     if not post:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not found.")
     
     title = post.title[:50]
-    return templates.TemplateResponse(
-            request,
-            "post.html",
-            {
-                "post":post,
-                "title": title
-            }
-        )
+    html = _post_template.render(request=request, post=post, title=title)
+    return HTMLResponse(html)
 
 
 @app.get("/user/{user_id}", include_in_schema=False, name="user_posts")
 async def user_posts(request: Request, user_id: int, db: Annotated[AsyncSession, Depends(get_db)]):
-    result = await db.execute(select(models.User).where(models.User.id == user_id))
-
-    user = result.scalar_one_or_none()
+    user = await db.get(models.User, user_id)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found.")
     
     result = await db.execute(
         select(models.Post)
-        .options(selectinload(models.Post.author))
+        .options(selectinload(models.Post.author), raiseload("*"))
         .where(models.Post.user_id == user_id)
         .order_by(models.Post.date_posted.desc())
     )
@@ -97,14 +177,13 @@ async def user_posts(request: Request, user_id: int, db: Annotated[AsyncSession,
     if not user_posts:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User has no posts.")
     
-    return templates.TemplateResponse(
-        request,
-        "user_posts.html",
-        {
-            "posts": user_posts,
-            "title": f"Posts by {user.username}"
-        }
+    html = await run_in_threadpool(
+        _user_posts_template.render,
+        request=request,
+        posts=user_posts,
+        title=f"Posts by {user.username}",
     )
+    return HTMLResponse(html)
 
 
 @app.get("/login", include_in_schema=False)
@@ -124,11 +203,118 @@ async def register_page(request: Request):
     )
 
 
+# The public GET pages change when posts change or when an author's profile
+# changes (the pages render usernames and profile images), so a weak ETag
+# derived from MAX(updated_at) and the row count (cheap aggregates over posts
+# and users) lets repeat visitors and CDNs revalidate with a 304 instead of
+# re-querying and re-rendering the whole page. updated_at (not date_posted)
+# is what the update statements bump, so edits invalidate the tags; the
+# count catches deletes.
+_FEED_PATHS = {"/", "/posts", "/api/post/posts"}
+
+
+def _ts(value: datetime | None) -> str:
+    # str(datetime) contains a space, which is not a legal etagc character
+    # (RFC 9110 section 8.8.3); isoformat keeps the tag parseable by proxies.
+    return value.isoformat() if value is not None else "0"
+
+
+def _tail_int(path: str, prefix: str) -> int | None:
+    if not path.startswith(prefix):
+        return None
+    tail = path[len(prefix):]
+    return int(tail) if tail.isdigit() else None
+
+
+async def _compute_etag(path: str) -> str | None:
+    async with AsyncSessionLocal() as db:
+        if path in _FEED_PATHS:
+            latest, count, users_latest = (
+                await db.execute(
+                    select(
+                        func.max(models.Post.updated_at),
+                        func.count(models.Post.id),
+                        select(func.max(models.User.updated_at)).scalar_subquery(),
+                    )
+                )
+            ).one()
+            return f'W/"feed-{_ts(latest)}-{count}-{_ts(users_latest)}"'
+
+        post_id = _tail_int(path, "/post/") or _tail_int(path, "/api/post/")
+        if post_id is not None:
+            row = (
+                await db.execute(
+                    select(models.Post.updated_at, models.User.updated_at)
+                    .join(models.User, models.User.id == models.Post.user_id)
+                    .where(models.Post.id == post_id)
+                )
+            ).first()
+            if row is not None:
+                return f'W/"post-{post_id}-{_ts(row[0])}-{_ts(row[1])}"'
+            return None
+
+        user_id = _tail_int(path, "/user/")
+        if user_id is None and path.endswith("/posts"):
+            user_id = _tail_int(path[: -len("/posts")], "/api/user/")
+        if user_id is not None:
+            latest, count, user_updated = (
+                await db.execute(
+                    select(
+                        func.max(models.Post.updated_at),
+                        func.count(models.Post.id),
+                        select(models.User.updated_at)
+                        .where(models.User.id == user_id)
+                        .scalar_subquery(),
+                    ).where(models.Post.user_id == user_id)
+                )
+            ).one()
+            if count:
+                return f'W/"user-{user_id}-{_ts(latest)}-{count}-{_ts(user_updated)}"'
+    return None
+
+
+@app.middleware("http")
+async def conditional_get(request: Request, call_next):
+    if request.method != "GET":
+        return await call_next(request)
+
+    etag = await _compute_etag(request.scope["path"])
+    if etag is None:
+        return await call_next(request)
+
+    if request.headers.get("if-none-match") == etag:
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag}
+        )
+
+    response = await call_next(request)
+    if response.status_code == status.HTTP_200_OK:
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "public, max-age=30"
+    return response
+
+
+_API_PREFIX = b"/api"
+
+
+def _is_api_request(request: Request) -> bool:
+    # Compare against the raw ASGI path bytes; request.url.path would build a
+    # URL object and a new string on every (error-heavy) call.
+    raw_path = request.scope.get("raw_path")
+    if raw_path is None:
+        raw_path = request.scope["path"].encode()
+    return raw_path.startswith(_API_PREFIX)
+
+
 @app.exception_handler(StarletteHTTPException)
 async def general_http_exception_handler(request: Request, exception: StarletteHTTPException):
 
-    if request.url.path.startswith("/api"):
-        return await http_exception_handler (request, exception)
+    if _is_api_request(request):
+        return ORJSONResponse(
+            {"detail": exception.detail},
+            status_code=exception.status_code,
+            headers=getattr(exception, "headers", None),
+        )
 
     message = (
         exception.detail
@@ -136,29 +322,26 @@ async def general_http_exception_handler(request: Request, exception: StarletteH
         else "An error occurred. Please check your request and try again."
     )
 
-    return templates.TemplateResponse(
-        request,
-        "error.html",
-        {
-            "status_code": exception.status_code,
-            "title": exception.status_code,
-            "message": message,
-        },
+    body = _error_template.render(
+        request=request,
         status_code=exception.status_code,
+        title=exception.status_code,
+        message=message,
     )
+    return HTMLResponse(body, status_code=exception.status_code)
 
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exception: RequestValidationError):
-    if request.url.path.startswith("/api"):
-        return await request_validation_exception_handler(request, exception)
+    if _is_api_request(request):
+        return ORJSONResponse(
+            {"detail": jsonable_encoder(exception.errors())},
+            status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+        )
 
-    return templates.TemplateResponse(
-        request,
-        "error.html",
-        {
-            "status_code": status.HTTP_422_UNPROCESSABLE_CONTENT,
-            "title": status.HTTP_422_UNPROCESSABLE_CONTENT,
-            "message": "Invalid request. Please check your input and try again.",
-        },
+    body = _error_template.render(
+        request=request,
         status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
-    )
\ No newline at end of file
+        title=status.HTTP_422_UNPROCESSABLE_CONTENT,
+        message="Invalid request. Please check your input and try again.",
+    )
+    return HTMLResponse(body, status_code=status.HTTP_422_UNPROCESSABLE_CONTENT)
\ No newline at end of file
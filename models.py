@@ -1,5 +1,5 @@
 from __future__ import annotations
-from sqlalchemy import DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, String, Text, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from database import Base
 
@@ -13,7 +13,12 @@ class User(Base):
     username: Mapped[str] = mapped_column(String(100), unique=True, nullable=False)
     password_hash: Mapped[str] = mapped_column(String(200), nullable=False)
     image_file: Mapped[str | None] = mapped_column(String, nullable=True, default=None)
-    
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(UTC),
+        onupdate=lambda: datetime.now(UTC),  # Bumped on profile edits; drives the ETags
+    )
+
     posts: Mapped[list[Post]] = relationship(
         back_populates="author",
         cascade="all, delete-orphan"  # Cascade delete posts when user is deleted
@@ -26,6 +31,11 @@ class User(Base):
         return "/static/profile_pics/default.jpg"
 
 
+# The duplicate checks compare lower(username), which the plain unique index
+# on username cannot serve - this functional index makes them an index seek.
+Index("ix_users_username_lower", func.lower(User.username), unique=True)
+
+
 class Post(Base):
     __tablename__ = "posts"
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
@@ -40,5 +50,14 @@ class Post(Base):
         DateTime(timezone=True),
         default= lambda: datetime.now(UTC)
     )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(UTC),
+        onupdate=lambda: datetime.now(UTC),  # Bumped on every edit; drives the ETags
+    )
 
     author: Mapped[User] = relationship(back_populates="posts") # Many to one relationship
+
+
+# Covers the keyset-paginated feeds ordered by (date_posted, id) descending.
+Index("ix_posts_date_id", Post.date_posted.desc(), Post.id.desc())
@@ -1,9 +1,10 @@
 from typing import Annotated
+from datetime import datetime
 
-from fastapi import APIRouter, status, Depends, HTTPException
-from sqlalchemy.orm import selectinload
+from fastapi import APIRouter, Query, status, Depends, HTTPException
+from sqlalchemy.orm import joinedload, raiseload
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import and_, delete, exists, or_, select, update
 from database import get_db
 
 import models
@@ -11,52 +12,116 @@ from schemas import PostResponse, PostCreate, PostUpdate
 
 router = APIRouter()
 
-# Get all posts
-@router.get("/posts", response_model=list[PostResponse], status_code=status.HTTP_200_OK)
-async def get_posts(db: Annotated[AsyncSession, Depends(get_db)]):
-    result = await db.execute(
-        select(models.Post) 
-        .options(selectinload(models.Post.author))
-        .order_by(models.Post.date_posted.desc())
+
+def post_to_dict(post: models.Post) -> dict:
+    """Project a Post (with its author loaded) into the PostResponse shape.
+
+    Read endpoints return this directly instead of going through
+    response_model, skipping the per-row Pydantic validation pass.
+    """
+    return {
+        "title": post.title,
+        "content": post.content,
+        "id": post.id,
+        "user_id": post.user_id,
+        "date_posted": post.date_posted,
+        "author": {
+            "id": post.author.id,
+            "username": post.author.username,
+            "image_file": post.author.image_file,
+            "image_path": post.author.image_path,
+        },
+    }
+
+
+def _keyset_before(cursor: datetime, cursor_id: int | None):
+    """Predicate selecting rows strictly before (cursor, cursor_id) in the
+    feeds' (date_posted, id) descending order.
+
+    Without the id tie-break, rows sharing the boundary row's timestamp
+    would be skipped on the next page.
+    """
+    if cursor_id is None:
+        return models.Post.date_posted < cursor
+    return or_(
+        models.Post.date_posted < cursor,
+        and_(models.Post.date_posted == cursor, models.Post.id < cursor_id),
     )
-    posts = result.scalars().all()
-    return posts
+
+
+# Get all posts (paginated list view; full content lives at /api/post/{id})
+@router.get("/posts", status_code=status.HTTP_200_OK)
+async def get_posts(
+    db: Annotated[AsyncSession, Depends(get_db)],
+    limit: Annotated[int, Query(ge=1, le=100)] = 20,
+    cursor: datetime | None = None,
+    cursor_id: int | None = None,
+):
+    stmt = (
+        select(
+            models.Post.id,
+            models.Post.title,
+            models.Post.user_id,
+            models.Post.date_posted,
+            models.User.username,
+        )
+        .join(models.User, models.User.id == models.Post.user_id)
+        .order_by(models.Post.date_posted.desc(), models.Post.id.desc())
+        .limit(limit)
+    )
+    if cursor is not None:
+        stmt = stmt.where(_keyset_before(cursor, cursor_id))
+
+    rows = (await db.execute(stmt)).all()
+    items = [
+        {
+            "id": row.id,
+            "title": row.title,
+            "user_id": row.user_id,
+            "date_posted": row.date_posted,
+            "author": row.username,
+        }
+        for row in rows
+    ]
+    # A short page means the table is exhausted; no cursor to follow.
+    next_cursor = (
+        {"date_posted": rows[-1].date_posted, "id": rows[-1].id}
+        if len(rows) == limit
+        else None
+    )
+    return {"items": items, "next_cursor": next_cursor}
 
 @router.post("", response_model=PostResponse, status_code=status.HTTP_201_CREATED)
 async def create_post(post: PostCreate, db: Annotated[AsyncSession, Depends(get_db)]):
     # Check if the user exists
-    result = await  db.execute(
-        select(models.User).where(models.User.id == post.user_id),
-    )
-    user = result.scalar_one_or_none()
+    user = await db.get(models.User, post.user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found."
         )
-    #Create the post
+    #Create the post - assigning the already-loaded user populates the author
+    # relationship directly, so no refresh round-trip is needed after commit
     new_post = models.Post(
         title = post.title,
         content = post.content,
-        user_id = post.user_id,
+        author = user,
     )
     db.add(new_post)
     await db.commit()
-    await db.refresh(new_post, attribute_names=["author"])
     return new_post
 
-@router.get("/{post_id}", response_model=PostResponse, status_code=status.HTTP_200_OK)
+@router.get("/{post_id}", status_code=status.HTTP_200_OK)
 async def get_post(post_id: int, db   : Annotated[AsyncSession, Depends(get_db)]):
-    result = await db.execute(
-        select(models.Post).options(selectinload(models.Post.author)).where(models.Post.id == post_id),
+    post = await db.get(
+        models.Post, post_id, options=[joinedload(models.Post.author), raiseload("*")],
     )
-    post = result.scalar_one_or_none()
     if not post:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Post not found."
         )
-    return post
+    return post_to_dict(post)
 
 # Full post update
 @router.put(
@@ -64,35 +129,35 @@ async def get_post(post_id: int, db   : Annotated[AsyncSession, Depends(get_db)]
     response_model=PostResponse,
 )
 async def full_post_update(post_id: int, post_data: PostCreate, db: Annotated[AsyncSession, Depends(get_db)]):
-    # Check if the post exists
-    result = await db.execute(
-        select(models.Post).options(selectinload(models.Post.author)).where(models.Post.id == post_id),
+    # Check if the user exists - a single boolean round-trip instead of
+    # fetching the whole user row
+    user_exists = await db.scalar(
+        select(exists().where(models.User.id == post_data.user_id)),
     )
-    post = result.scalar_one_or_none()
-    if not post:
+    if not user_exists:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="Post not found."
+            detail="User not found."
         )
 
-    # Check if the user is the original poster.
-    if post.user_id != post_data.user_id:
-        # Check if the user exists
-        result = await db.execute(
-            select(models.User).where(models.User.id == post_data.user_id),
+    # Update the post in place; RETURNING doubles as the existence check
+    result = await db.execute(
+        update(models.Post)
+        .where(models.Post.id == post_id)
+        .values(
+            title=post_data.title,
+            content=post_data.content,
+            user_id=post_data.user_id,
         )
-        user = result.scalar_one_or_none()
-        if not user:
-            raise HTTPException(
+        .returning(models.Post)
+    )
+    post = result.scalar_one_or_none()
+    if not post:
+        raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found."
+            detail="Post not found."
         )
 
-    # Update the post
-    post.title = post_data.title
-    post.content = post_data.content
-    post.user_id = post_data.user_id
-
     await db.commit()
     await db.refresh(post, attribute_names=["author"])
     return post
@@ -103,9 +168,26 @@ async def full_post_update(post_id: int, post_data: PostCreate, db: Annotated[As
     response_model=PostResponse,
 )
 async def partial_post_update(post_id: int, post_data: PostUpdate, db: Annotated[AsyncSession, Depends(get_db)]):
-    # Check if the post exists
+    post_update = post_data.model_dump(exclude_unset=True)
+
+    # Nothing to change - just return the current post (still a 404 check)
+    if not post_update:
+        post = await db.get(
+            models.Post, post_id, options=[joinedload(models.Post.author), raiseload("*")],
+        )
+        if not post:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Post not found."
+            )
+        return post
+
+    # Apply the change in one statement; RETURNING doubles as the 404 check
     result = await db.execute(
-        select(models.Post).options(selectinload(models.Post.author)).where(models.Post.id == post_id),
+        update(models.Post)
+        .where(models.Post.id == post_id)
+        .values(**post_update)
+        .returning(models.Post)
     )
     post = result.scalar_one_or_none()
     if not post:
@@ -114,10 +196,6 @@ async def partial_post_update(post_id: int, post_data: PostUpdate, db: Annotated
             detail="Post not found."
         )
 
-    post_update = post_data.model_dump(exclude_unset=True)
-    for key, value in post_update.items():
-        setattr(post, key, value)
-
     await db.commit()
     await db.refresh(post, attribute_names=["author"])
     return post
@@ -128,17 +206,15 @@ async def partial_post_update(post_id: int, post_data: PostUpdate, db: Annotated
     status_code=status.HTTP_204_NO_CONTENT
 )
 async def delete_post(post_id: int, db: Annotated[AsyncSession, Depends(get_db)]):
-    # Check if the post exists
+    # Delete in one statement; an empty RETURNING doubles as the 404 check
     result = await db.execute(
-        select(models.Post).options(selectinload(models.Post.author)).where(models.Post.id == post_id),
+        delete(models.Post).where(models.Post.id == post_id).returning(models.Post.id)
     )
-    post = result.scalar_one_or_none()
-    if not post:
+    if result.first() is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Post not found."
         )
 
-    await db.delete(post)
     await db.commit()
 
@@ -1,16 +1,17 @@
 import models
 from typing import Annotated
-from datetime import timedelta
+from datetime import datetime, timedelta
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy import select, func
-from sqlalchemy.orm import selectinload
+from sqlalchemy import bindparam, select, func, or_
+from sqlalchemy.orm import raiseload, selectinload
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from database import get_db
 from config import settings
-from schemas import UserCreate, UserPublic, UserPrivate, UserUpdate, PostResponse, Token 
+from schemas import UserCreate, UserPublic, UserPrivate, UserUpdate, Token
+from routers.posts import _keyset_before, post_to_dict
 from auth import (
     create_access_token, 
     password_hash, 
@@ -22,42 +23,51 @@ from auth import (
 
 router = APIRouter()
 
+# Built once at import so every login reuses the same statement object and is
+# a guaranteed hit in the engine's compiled-SQL cache.
+_SELECT_USER_BY_EMAIL = select(models.User).where(
+    models.User.email == bindparam("email")
+)
+
 @router.post(
     "",
     response_model=UserPrivate,
     status_code = status.HTTP_201_CREATED
 )
 async def create_user(user: UserCreate, db: Annotated[AsyncSession, Depends(get_db)]):
-    # Check for duplicate username
-    result = await db.execute(
-        select(models.User).where(func.lower(models.User.username) == user.username.lower()),
-    )
-    if result.scalars().first():
-        raise HTTPException(
-            status_code = status.HTTP_400_BAD_REQUEST,
-            detail = f"User with username: {user.username} already exists."
-        )
-
-    # Check for duplicate email
+    # Check for duplicate username or email in a single round-trip. Only the
+    # two compared columns are selected, so the check never drags whole user
+    # rows (password hash included) over the wire just to discard them.
     result = await db.execute(
-        select(models.User).where(models.User.email == user.email),
+        select(models.User.username, models.User.email).where(
+            or_(
+                func.lower(models.User.username) == user.username.lower(),
+                models.User.email == user.email,
+            )
+        ),
     )
-    if result.scalars().first():
+    for existing in result:
+        if existing.username.lower() == user.username.lower():
+            raise HTTPException(
+                status_code = status.HTTP_400_BAD_REQUEST,
+                detail = f"User with username: {user.username} already exists."
+            )
         raise HTTPException(
             status_code = status.HTTP_400_BAD_REQUEST,
             detail = f"User with email: {user.email} already exists."
         )
-    
+
     new_user = models.User(
         username = user.username,
         email = user.email,
-        password_hash = password_hash(user.password)
+        password_hash = await password_hash(user.password)
     )
 
     db.add(new_user)
     await db.commit()
-    await db.refresh(new_user)
 
+    # No refresh needed: the INSERT already populated the id on flush and
+    # expire_on_commit=False keeps the attributes loaded after commit.
     return new_user
 
 @router.post("/token", response_model=Token)
@@ -68,15 +78,14 @@ async def login_for_access_token(
     # Look up user by email
     # Note: OAuth2PasswordRequestForm uses "username" field, but we treat it as email
     result = await db.execute(
-        select(models.User).where(
-            models.User.email == form_data.username.lower(),
-        ),
+        _SELECT_USER_BY_EMAIL,
+        {"email": form_data.username.lower()},
     )
     user = result.scalars().first()
 
     # Verify user exists and password is correct
     # Don't reveal which one failed (security best practice)
-    if not user or not verify_password(form_data.password, user.password_hash):
+    if not user or not await verify_password(form_data.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -116,10 +125,7 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    result = await db.execute(
-        select(models.User).where(models.User.id == user_id_int),
-    )
-    user = result.scalars().first()
+    user = await db.get(models.User, user_id_int)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -136,10 +142,7 @@ async def get_current_user(
     status_code=status.HTTP_200_OK
 )
 async def get_user(user_id: int, db: Annotated[AsyncSession, Depends(get_db)]):
-    result = await db.execute(
-        select(models.User).where(models.User.id == user_id),
-    )
-    user = result.scalar_one_or_none()
+    user = await db.get(models.User, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -156,46 +159,51 @@ async def get_user(user_id: int, db: Annotated[AsyncSession, Depends(get_db)]):
 async def update_user(user_id: int, user_data: UserUpdate, db: Annotated[AsyncSession, Depends(get_db)]):
     
     # Fetch the user frmom the db
-    result = await db.execute(
-        select(models.User).where(models.User.id == user_id)
-    )
-    user = result.scalars().first()
+    user = await db.get(models.User, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found."
         )
 
-    # Check if the new username or email already exists
-    
-    if user_data.username is not None and user_data.username.lower() != user.username.lower():
-        result = await db.execute(
-            select(models.User).where(func.lower(models.User.username) == user_data.username.lower())
-        )
-        if result.scalars().first():
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"User with username: {user_data.username} already exists."
-            )
+    new_user_data = user_data.model_dump(exclude_unset=True)
 
-    if user_data.email is not None and user_data.email != user.email:
+    # Check if the new username or email already exists, but only query for
+    # the fields the request actually changes (one query covers both). A
+    # PATCH that touches neither - e.g. image_file only - skips the query.
+    new_username = new_user_data.get("username")
+    new_email = new_user_data.get("email")
+
+    conditions = []
+    if new_username is not None and new_username.lower() != user.username.lower():
+        conditions.append(func.lower(models.User.username) == new_username.lower())
+
+    if new_email is not None and new_email != user.email:
+        conditions.append(models.User.email == new_email)
+
+    if conditions:
         result = await db.execute(
-            select(models.User).where(models.User.email == user_data.email)
+            select(models.User.username, models.User.email).where(or_(*conditions))
         )
-        if result.scalars().first():
+        for existing in result:
+            if (
+                new_username is not None
+                and existing.username.lower() == new_username.lower()
+            ):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"User with username: {new_username} already exists."
+                )
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"User with email: {user_data.email} already exists."
+                detail=f"User with email: {new_email} already exists."
             )
 
     # Update the user
-    new_user_data = user_data.model_dump(exclude_unset=True)
-        
     for field, value in new_user_data.items():
         setattr(user, field, value)
 
     await db.commit()
-    await db.refresh(user)
     return user
 
 
@@ -205,10 +213,7 @@ async def update_user(user_id: int, user_data: UserUpdate, db: Annotated[AsyncSe
 )
 async def delete_user(user_id: int, db: Annotated[AsyncSession, Depends(get_db)]):
     # Fetch the user frmom the db
-    result = await db.execute(
-        select(models.User).where(models.User.id == user_id)
-    )
-    user = result.scalars().first()
+    user = await db.get(models.User, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -221,30 +226,47 @@ async def delete_user(user_id: int, db: Annotated[AsyncSession, Depends(get_db)]
 # Get User posts
 @router.get(
     "/{user_id}/posts",
-    response_model=list[PostResponse],
     status_code=status.HTTP_200_OK
 )
-async def get_user_posts(user_id: int, db: Annotated[AsyncSession, Depends(get_db)]):
+async def get_user_posts(
+    user_id: int,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    limit: Annotated[int, Query(ge=1, le=100)] = 20,
+    cursor: datetime | None = None,
+    cursor_id: int | None = None,
+):
     # Check if the user exists
-    result = await db.execute(
-        select(models.User).where(models.User.id == user_id),
-    )
-    user = result.scalar_one_or_none()
+    user = await db.get(models.User, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found."
         )
-    
-    # Get user posts
-    result = await db.execute(
-        select(models.Post).options(selectinload(models.Post.author)).where(models.Post.user_id == user_id).order_by(models.Post.date_posted.desc()),
+
+    # Get one page of the user's posts
+    stmt = (
+        select(models.Post)
+        .options(selectinload(models.Post.author), raiseload("*"))
+        .where(models.Post.user_id == user_id)
+        .order_by(models.Post.date_posted.desc(), models.Post.id.desc())
+        .limit(limit)
     )
+    if cursor is not None:
+        stmt = stmt.where(_keyset_before(cursor, cursor_id))
+    result = await db.execute(stmt)
     posts = result.scalars().all()
-    
-    if not posts:
+
+    if not posts and cursor is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User has no posts."
         )
-    return posts
\ No newline at end of file
+    next_cursor = (
+        {"date_posted": posts[-1].date_posted, "id": posts[-1].id}
+        if len(posts) == limit
+        else None
+    )
+    return {
+        "items": [post_to_dict(post) for post in posts],
+        "next_cursor": next_cursor,
+    }
\ No newline at end of file
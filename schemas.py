@@ -63,4 +63,9 @@ class PostResponse(PostBase):
     date_posted: datetime
     author: UserPublic
 
-    
+
+# Finalize the response models' core schemas at import so the first request
+# never pays for a deferred rebuild.
+for _model in (UserPublic, UserPrivate, PostResponse):
+    _model.model_rebuild()
+